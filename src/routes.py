@@ -37,7 +37,15 @@ services: Dict[str, BasicService] = {}
 
 # Simple helper function for loading a service into our management dict
 def loadService(name, details):
-    services[name] = BasicService(name, details['hosts'], details['routes'])
+    # Run the details through the model so config files get the same validation (and defaults) as the API
+    details = BasicServiceModel(**details).dict()
+
+    services[name] = BasicService(
+        name, details['hosts'], details['routes'],
+        hostGroups=details['hostGroups'],
+        localZone=details['localZone'],
+        failoverThreshold=details['failoverThreshold']
+    )
         
     if details['healthcheck'] is not None:
         services[name].changeHealthcheck(details['healthcheck'])
@@ -116,14 +124,18 @@ def update_an_existing_service(serviceName: str, serviceDetails: BasicServiceMod
             continue
         
         elif key == 'hosts':
-            serviceToUpdate.clearHosts()
-            for host in value:
-                serviceToUpdate.addHost(host)
+            serviceToUpdate.replaceHosts(value)
+
+        elif key == 'hostGroups':
+            serviceToUpdate.replaceHostGroups(value)
 
         # This is quick and dirty and generally bad. Only here for simplicity in implementation
         elif hasattr(serviceToUpdate, key):
             setattr(serviceToUpdate, key, value)
 
+    # Hosts, zones and the threshold all feed into the tiers, so only rebuild once everything is applied
+    serviceToUpdate.rebuildTiers()
+
     return response({"status": "success", "details": serviceToUpdate.details()})
 
 
@@ -1,31 +1,61 @@
 # Simple class for some basic backend service
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from fastapi import Request
 
+# Number of slots in the precomputed tier schedule, so traffic can be split between tiers in 1% steps
+TIER_SCHEDULE_SLOTS = 100
+
+# Fraction of a tier's hosts that need to be healthy for it to keep all of its traffic
+DEFAULT_FAILOVER_THRESHOLD = 0.7
+
+# Stands in for a zone or priority that wasn't given, since a zone of None means the host has no zone
+UNCHANGED = object()
+
+class HostGroupModel(BaseModel):
+    hosts: List[str]
+    zone: Optional[str] = None
+    priority: int = 0
+
 class BasicServiceModel(BaseModel):
     hosts: List[str]
     routes: List[str]
     healthcheck: Optional[str] = None
     routing: Optional[str] = 'RR'
+    hostGroups: Optional[List[HostGroupModel]] = None
+    localZone: Optional[str] = None
+    failoverThreshold: float = Field(DEFAULT_FAILOVER_THRESHOLD, gt=0, le=1)
 
 class BasicServiceModelUpdate(BaseModel):
-    hosts: Optional[List[str]]
-    routes: Optional[List[str]]
-    healthcheck: Optional[str]
-    routing: Optional[str]
+    hosts: Optional[List[str]] = None
+    routes: Optional[List[str]] = None
+    healthcheck: Optional[str] = None
+    routing: Optional[str] = None
+    hostGroups: Optional[List[HostGroupModel]] = None
+    localZone: Optional[str] = None
+    failoverThreshold: Optional[float] = Field(None, gt=0, le=1)
 
 class BasicService:
     tracker: int = 0
 
-    def __init__(self, name: str, hosts: list = [], routes: list = [], healthcheck: str = '/status', routing = 'RR'):
+    def __init__(self, name: str, hosts: list = [], routes: list = [], healthcheck: str = '/status', routing = 'RR',
+                 hostGroups: list = None, localZone: str = None, failoverThreshold: float = DEFAULT_FAILOVER_THRESHOLD):
         self.name = name
         self.routes = routes
         self.routing = routing
-        
+        self.localZone = localZone
+        self.failoverThreshold = failoverThreshold
+
+        # Hosts are grouped by their (zone, priority) labels. Unlabeled hosts all live in the (None, 0) group
         self.hosts = {}
-        for host in hosts:
-            self.hosts[host] = 200
+        self.hostLabels = {}
+        self.hostGroups = {}
+        self.tierTrackers = {}
+        self.loadHosts(hosts)
+        for group in hostGroups or []:
+            self.loadHosts(group['hosts'], group.get('zone'), group.get('priority', 0))
+
+        self.rebuildTiers()
 
         # This is only here because in reality we'd have a service polling for service health
         # This simple example doesn't actually do that, it's just here because it should be
@@ -40,18 +70,116 @@ class BasicService:
 
     def setHealth(self, host: str, status: int = 200):
         self.hosts[host] = status
+        self.labelHost(host)
+
+        # Health only changes here, so this is where the tiers get recalculated rather than on every request
+        self.rebuildTiers()
 
-    def addHost(self, host: str):
-        # This is just a shortcut to setHealth() since it can already add a service
+    def addHost(self, host: str, zone = UNCHANGED, priority = UNCHANGED):
+        self.addHosts([host], zone, priority)
+
+    def addHosts(self, hosts: list, zone = UNCHANGED, priority = UNCHANGED):
         # Adding an already existing host simply sets the host to healthy, which is a nice side affect
-        self.setHealth(host)
+        # It keeps its zone and priority unless new ones are given
+        for host in hosts:
+            self.hosts[host] = 200
+            self.labelHost(host, zone, priority)
+
+        self.rebuildTiers()
 
     def removeHost(self, host: str):
         del self.hosts[host]
+        self.unlabelHost(host)
+        self.rebuildTiers()
 
     def clearHosts(self):
+        self.replaceHosts([])
+        self.rebuildTiers()
+
+    def replaceHosts(self, hosts: list):
+        # Swaps out every host as healthy and unlabeled. Doesn't rebuild the tiers, see loadHosts()
         self.hosts = {}
+        self.hostLabels = {}
+        self.hostGroups = {}
         self.tracker = 0 # reset track counter as well just to be clean
+        self.tierTrackers = {}
+        self.loadHosts(hosts)
+
+    def labelHost(self, host: str, zone = UNCHANGED, priority = UNCHANGED):
+        # Moves the host into the group for its labels, dropping it from any group it was previously in.
+        # Labels that aren't given are kept from the old group, or default to unlabeled for a new host
+        oldZone, oldPriority = self.hostLabels.get(host, (None, 0))
+        labels = (oldZone if zone is UNCHANGED else zone, oldPriority if priority is UNCHANGED else priority)
+        if self.hostLabels.get(host) == labels:
+            return
+
+        self.unlabelHost(host)
+        self.hostLabels[host] = labels
+        self.hostGroups.setdefault(labels, []).append(host)
+
+    def unlabelHost(self, host: str):
+        if host not in self.hostLabels:
+            return
+
+        labels = self.hostLabels.pop(host)
+        self.hostGroups[labels].remove(host)
+        if len(self.hostGroups[labels]) == 0:
+            del self.hostGroups[labels]
+
+    def loadHosts(self, hosts: list, zone: str = None, priority: int = 0):
+        # Hosts that don't exist yet are added as healthy, existing hosts keep their health and get exactly these labels.
+        # This doesn't rebuild the tiers so a whole batch of changes only needs one rebuildTiers() at the end
+        for host in hosts:
+            self.hosts.setdefault(host, 200)
+            self.labelHost(host, zone, priority)
+
+    def replaceHostGroups(self, hostGroups: list):
+        # Every host not in one of the groups goes back to being unlabeled. Doesn't rebuild the tiers, see loadHosts()
+        for host in self.hosts:
+            self.labelHost(host, None, 0)
+
+        for group in hostGroups:
+            self.loadHosts(group['hosts'], group.get('zone'), group.get('priority', 0))
+
+    # NOTE: This is where the zone/priority failover is worked out
+    def rebuildTiers(self):
+        # Tiers are ordered local zone first, then by priority. Groups with the same ordering share a tier
+        tiers = {}
+        for (zone, priority), groupHosts in self.hostGroups.items():
+            isRemote = self.localZone is not None and zone != self.localZone
+            tiers.setdefault((isRemote, priority), []).extend(groupHosts)
+
+        # Each tier keeps all traffic until its healthy fraction drops below the threshold,
+        # past that it only takes a proportional share and the rest spills over to the next tier
+        healthyTiers = {}
+        shares = {}
+        remaining = 1.0
+        for tier in sorted(tiers):
+            healthyHosts = [host for host in tiers[tier] if self.checkHealth(host)[0] == 200]
+            if len(healthyHosts) == 0:
+                continue
+
+            healthyFraction = len(healthyHosts) / len(tiers[tier])
+            share = min(remaining, healthyFraction / self.failoverThreshold)
+
+            healthyTiers[tier] = healthyHosts
+            shares[tier] = share
+            remaining -= share
+
+        # Lay the shares out as a fixed schedule of tiers so picking a host is just an index lookup.
+        # If every tier is degraded the shares won't add up to 1, which is fine since they're only compared to each other
+        if len(shares) <= 1:
+            schedule = list(shares)
+        else:
+            schedule = []
+            assigned = {tier: 0 for tier in shares}
+            for slot in range(1, TIER_SCHEDULE_SLOTS + 1):
+                tier = max(shares, key=lambda tier: shares[tier] * slot - assigned[tier])
+                assigned[tier] += 1
+                schedule.append(tier)
+
+        # Requests are served from a threadpool, so publish the schedule and its hosts together in one assignment
+        self.tierState = (schedule, healthyTiers)
 
     def addRoute(self, route: str):
         # Would probably be better to enforce route uniqueness a bit better here
@@ -70,30 +198,48 @@ class BasicService:
             'hosts': {host:self.checkHealth(host)[1] for host in self.hosts.keys()},
             'routes': self.routes,
             'routing': self.routing,
-            'healthcheck': self.healthcheck
+            'healthcheck': self.healthcheck,
+            'hostGroups': self.dumpHostGroups(),
+            'localZone': self.localZone,
+            'failoverThreshold': self.failoverThreshold
         }
 
+    def dumpHostGroups(self):
+        # Unlabeled hosts are already covered by 'hosts', so only labeled groups are listed
+        return [
+            {'zone': zone, 'priority': priority, 'hosts': groupHosts}
+            for (zone, priority), groupHosts in self.hostGroups.items() if (zone, priority) != (None, 0)
+        ]
+
     def dumpConfig(self):
         return {
             'hosts': list(self.hosts.keys()),
             'routes': self.routes,
             'routing': self.routing,
-            'healthcheck': self.healthcheck
+            'healthcheck': self.healthcheck,
+            'hostGroups': self.dumpHostGroups(),
+            'localZone': self.localZone,
+            'failoverThreshold': self.failoverThreshold
         }
 
     # NOTE: This is where the round robin is implemented
     def pickHealthyHost(self):
-        healthyHosts = [host for host in self.hosts if self.checkHealth(host)[0] == 200]
+        schedule, healthyTiers = self.tierState
 
-        if len(healthyHosts) == 0:
+        if len(schedule) == 0:
             print('NO HEALTHY HOSTS!!!')
             return None
         
         # This is Round Robin. To add support for other algos, just add more cases here
         if self.routing == 'RR':
-            hostIndex = self.tracker % len(healthyHosts)
+            # Pick the tier from the precomputed schedule, then round robin within that tier's healthy hosts
+            tier = schedule[self.tracker % len(schedule)]
             self.tracker += 1
 
+            healthyHosts = healthyTiers[tier]
+            hostIndex = self.tierTrackers.get(tier, 0) % len(healthyHosts)
+            self.tierTrackers[tier] = self.tierTrackers.get(tier, 0) + 1
+
             print(f"Healthy hosts: {healthyHosts}, using {healthyHosts[hostIndex]}")
             return healthyHosts[hostIndex]
 
@@ -177,4 +177,187 @@ class TestReadWriteServices(unittest.TestCase):
         # Should go to newHost server
         response = client.get('/someNewThing/in/the/hat')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json()['message'], 'Forwarded GET request to http://newHost/in/the/hat')
\ No newline at end of file
+        self.assertEqual(response.json()['message'], 'Forwarded GET request to http://newHost/in/the/hat')
+
+class TestZoneAwareServices(unittest.TestCase):
+
+    zonedService = {
+        'hosts': [],
+        'routes': ['/in/the/hat'],
+        'hostGroups': [
+            {'zone': 'zoneA', 'priority': 0, 'hosts': ['local1', 'local2']},
+            {'zone': 'zoneB', 'priority': 1, 'hosts': ['remote1', 'remote2']}
+        ],
+        'localZone': 'zoneA',
+        'failoverThreshold': 1.0
+    }
+
+
+    def setUp(self):
+        # Reset config before each test
+        src.routes.services = {}
+
+        response = client.put('/services/zonedThing', json=self.zonedService)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+
+        return super().setUp()
+
+
+    def assertForwardedTo(self, hosts):
+        for host in hosts:
+            response = client.get('/zonedThing/in/the/hat')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['message'], f"Forwarded GET request to http://{host}/in/the/hat")
+
+
+    def test_local_zone_healthy_keeps_traffic_local(self):
+        self.assertForwardedTo(['local1', 'local2', 'local1', 'local2'])
+
+
+    def test_degraded_local_zone_spills_over_proportionally(self):
+        response = client.post('/services/zonedThing/local2?status=500')
+        self.assertEqual(response.status_code, 200)
+
+        # Half the local zone is healthy, so half the traffic should spill over to the next tier
+        self.assertForwardedTo(['local1', 'remote1', 'local1', 'remote2'])
+
+
+    def test_degraded_local_zone_above_threshold_stays_local(self):
+        response = client.patch('/services/zonedThing', json={'failoverThreshold': 0.5})
+        self.assertEqual(response.status_code, 200)
+
+        response = client.post('/services/zonedThing/local2?status=500')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertForwardedTo(['local1', 'local1', 'local1'])
+
+
+    def test_local_zone_down_fails_over(self):
+        response = client.post('/services/zonedThing/local1?status=500')
+        self.assertEqual(response.status_code, 200)
+        response = client.post('/services/zonedThing/local2?status=500')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertForwardedTo(['remote1', 'remote2', 'remote1'])
+
+        # Healing the local zone should pull traffic back
+        response = client.post('/services/zonedThing/local1?status=200')
+        self.assertEqual(response.status_code, 200)
+        response = client.post('/services/zonedThing/local2?status=200')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertForwardedTo(['local1', 'local2', 'local1'])
+
+
+    def test_everything_down(self):
+        for host in ['local1', 'local2', 'remote1', 'remote2']:
+            response = client.post(f"/services/zonedThing/{host}?status=500")
+            self.assertEqual(response.status_code, 200)
+
+        response = client.get('/zonedThing/in/the/hat')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['message'], 'No healthy hosts found for zonedThing. See logs for details')
+
+
+    def test_default_threshold_splits_over_full_schedule(self):
+        response = client.put('/services/zonedThing', json={k: v for k, v in self.zonedService.items() if k != 'failoverThreshold'})
+        self.assertEqual(response.status_code, 200)
+
+        response = client.post('/services/zonedThing/local2?status=500')
+        self.assertEqual(response.status_code, 200)
+
+        # Half the local zone against a 0.7 threshold keeps 0.5 / 0.7 (~71%) of the traffic local
+        hostCounts = {}
+        for _ in range(100):
+            response = client.get('/zonedThing/in/the/hat')
+            self.assertEqual(response.status_code, 200)
+            host = response.json()['message'].split('//')[1].split('/')[0]
+            hostCounts[host] = hostCounts.get(host, 0) + 1
+
+        self.assertEqual(hostCounts, {'local1': 71, 'remote1': 15, 'remote2': 14})
+
+
+    def test_removing_sick_local_host_keeps_traffic_local(self):
+        response = client.post('/services/zonedThing/local2?status=500')
+        self.assertEqual(response.status_code, 200)
+        self.assertForwardedTo(['local1', 'remote1'])
+
+        # With the sick host gone, the local zone is fully healthy again
+        src.routes.services['zonedThing'].removeHost('local2')
+        self.assertForwardedTo(['local1', 'local1', 'local1'])
+
+
+    def test_readding_host_keeps_its_zone(self):
+        src.routes.services['zonedThing'].addHost('local1')
+        self.assertEqual(src.routes.services['zonedThing'].hostLabels['local1'], ('zoneA', 0))
+        self.assertForwardedTo(['local1', 'local2', 'local1'])
+
+
+    def test_patching_hosts_drops_labels(self):
+        response = client.patch('/services/zonedThing', json={'hosts': ['local1', 'remote1']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['details']['hostGroups'], [])
+
+        # Without labels nothing is local anymore, so it's plain round robin
+        self.assertForwardedTo(['local1', 'remote1', 'local1'])
+
+
+    def test_config_round_trip_keeps_labels(self):
+        response = client.post('/services/zonedThing/local2?status=500')
+        self.assertEqual(response.status_code, 200)
+
+        src.routes.loadService('reloadedThing', src.routes.services['zonedThing'].dumpConfig())
+
+        original = src.routes.services['zonedThing'].details()
+        reloaded = src.routes.services['reloadedThing'].details()
+        self.assertEqual(reloaded['hostGroups'], original['hostGroups'])
+        self.assertEqual(reloaded['localZone'], 'zoneA')
+        self.assertEqual(reloaded['failoverThreshold'], 1.0)
+
+        # Health isn't part of the config, so the reloaded service starts out fully healthy and local
+        response = client.get('/reloadedThing/in/the/hat')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['message'], 'Forwarded GET request to http://local1/in/the/hat')
+
+
+    def test_patching_host_groups_can_remove_zone(self):
+        response = client.patch('/services/zonedThing', json={'hostGroups': [
+            {'zone': 'zoneA', 'priority': 0, 'hosts': ['local1']},
+            {'zone': None, 'priority': 0, 'hosts': ['local2']},
+            {'zone': 'zoneB', 'priority': 1, 'hosts': ['remote1', 'remote2']}
+        ]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['details']['hostGroups'], [
+            {'zone': 'zoneA', 'priority': 0, 'hosts': ['local1']},
+            {'zone': 'zoneB', 'priority': 1, 'hosts': ['remote1', 'remote2']}
+        ])
+
+        # local2 has no zone anymore, so it's no longer part of the local tier
+        self.assertForwardedTo(['local1', 'local1', 'local1'])
+
+
+    def test_patching_host_groups_replaces_labels(self):
+        response = client.patch('/services/zonedThing', json={'hostGroups': [{'zone': 'zoneA', 'hosts': ['local1']}]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['details']['hostGroups'], [{'zone': 'zoneA', 'priority': 0, 'hosts': ['local1']}])
+
+        # local2 dropped out of the local zone, so losing local1 fails over to the unlabeled hosts
+        response = client.post('/services/zonedThing/local1?status=500')
+        self.assertEqual(response.status_code, 200)
+        self.assertForwardedTo(['local2', 'remote1', 'remote2', 'local2'])
+
+        # No groups at all is just plain round robin over the healthy hosts
+        response = client.patch('/services/zonedThing', json={'hostGroups': []})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['details']['hostGroups'], [])
+
+
+    def test_loading_config_validates_threshold(self):
+        config = src.routes.services['zonedThing'].dumpConfig()
+
+        for threshold in [0, -0.5, 1.5]:
+            with self.assertRaises(ValueError):
+                src.routes.loadService('badThing', {**config, 'failoverThreshold': threshold})
+
+        self.assertNotIn('badThing', src.routes.services)
@@ -111,7 +111,10 @@ class TestReadWriteServices(unittest.TestCase):
             }, 
             'routes': ['theCat', '/in/the/hat'], 
             'routing': 'RR', 
-            'healthcheck': '/status'
+            'healthcheck': '/status',
+            'hostGroups': [],
+            'localZone': None,
+            'failoverThreshold': 0.7
         })
 
         # Make service sick and check
@@ -129,7 +132,10 @@ class TestReadWriteServices(unittest.TestCase):
             }, 
             'routes': ['theCat', '/in/the/hat'], 
             'routing': 'RR', 
-            'healthcheck': '/status'
+            'healthcheck': '/status',
+            'hostGroups': [],
+            'localZone': None,
+            'failoverThreshold': 0.7
         })
 
         # Provide miracle cure for server
@@ -147,7 +153,10 @@ class TestReadWriteServices(unittest.TestCase):
             }, 
             'routes': ['theCat', '/in/the/hat'], 
             'routing': 'RR', 
-            'healthcheck': '/status'
+            'healthcheck': '/status',
+            'hostGroups': [],
+            'localZone': None,
+            'failoverThreshold': 0.7
         })
 
     
@@ -167,7 +176,10 @@ class TestReadWriteServices(unittest.TestCase):
             }, 
             'routes': ['theCat', '/in/the/hat'], 
             'routing': 'RR', 
-            'healthcheck': '/status'
+            'healthcheck': '/status',
+            'hostGroups': [],
+            'localZone': None,
+            'failoverThreshold': 0.7
         })
 
         # non-existent service
@@ -183,4 +195,37 @@ class TestReadWriteServices(unittest.TestCase):
         # bad health status
         response = client.post('/services/someNewThing/thing1:8080?status=-11111')
         self.assertEqual(response.status_code, 400)
-        self.assertEqual(response.json()['status'], 'I know this is a fake service, but the service code should be between 1 and 600')
\ No newline at end of file
+        self.assertEqual(response.json()['status'], 'I know this is a fake service, but the service code should be between 1 and 600')
+
+    def test_host_groups_in_details(self):
+        zonedService = {
+            **self.basicService,
+            'hostGroups': [{'zone': 'zoneA', 'hosts': ['thing1:8080', 'thing3']}],
+            'localZone': 'zoneA'
+        }
+
+        response = client.post('/services/someNewThing', json=zonedService)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'success')
+
+        response = client.get('/services/someNewThing')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['hosts'], {'thing1:8080': 'healthy', 'thing2': 'healthy', 'thing3': 'healthy'})
+        self.assertEqual(response.json()['hostGroups'], [{'zone': 'zoneA', 'priority': 0, 'hosts': ['thing1:8080', 'thing3']}])
+        self.assertEqual(response.json()['localZone'], 'zoneA')
+
+
+    def test_bad_values_for_failover_threshold(self):
+        for threshold in [0, -0.5, 1.5]:
+            response = client.post('/services/someNewThing', json={**self.basicService, 'failoverThreshold': threshold})
+            self.assertEqual(response.status_code, 422) # Failed fastAPI parsing/validating
+
+        response = client.post('/services/someNewThing', json=self.basicService)
+        self.assertEqual(response.status_code, 200)
+
+        response = client.patch('/services/someNewThing', json={'failoverThreshold': 1.5})
+        self.assertEqual(response.status_code, 422)
+
+        response = client.get('/services/someNewThing')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['failoverThreshold'], 0.7)